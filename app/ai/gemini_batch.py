@@ -0,0 +1,131 @@
+# app/ai/gemini_batch.py
+"""Offline warm-up of the Gemini mood -> genres cache via the Gemini Batch API.
+
+Usage (from the project root):
+
+    python -m app.ai.gemini_batch moods.txt gemini_warm_cache.json
+
+`moods.txt` holds one mood per line (e.g. the most frequent moods exported from
+logs); without it, the static FALLBACK_MAP vocabulary is used. Batch jobs may
+take up to 24h. Point HACK_GEMINI_WARM_CACHE_FILE at the output file and the API
+loads it at startup, so those moods never hit Gemini at request time.
+"""
+from __future__ import annotations
+from typing import List, Tuple, Dict, Any, Optional
+import logging
+import os
+import sys
+import time
+
+import orjson
+from ..config import settings
+from . import gemini_emotion
+from .genre_mapper import FALLBACK_MAP
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_DONE_STATES = {"BATCH_STATE_SUCCEEDED", "BATCH_STATE_FAILED", "BATCH_STATE_CANCELLED", "BATCH_STATE_EXPIRED"}
+
+def _token() -> str:
+    token: str | None = settings.gemini_api_key
+    if not token:
+        raise RuntimeError("GEMINI_API_KEY not configured (HACK_GEMINI_API_KEY)")
+    return token
+
+def build_requests(moods: List[str], top_k: int = 2) -> List[Dict[str, Any]]:
+    """One inline generateContent request per mood, tagged with the mood as key."""
+    return [
+        {
+            "request": {"contents": [{"parts": [{"text": gemini_emotion.build_prompt(mood, top_k)}]}]},
+            "metadata": {"key": mood},
+        }
+        for mood in moods
+    ]
+
+def submit(moods: List[str], top_k: int = 2) -> str:
+    """Create a batch job for `moods`; returns its name (``batches/...``)."""
+    body: Dict[str, Any] = {
+        "batch": {
+            "display_name": "mood-genre-warmup",
+            "input_config": {"requests": {"requests": build_requests(moods, top_k)}},
+        }
+    }
+    r = gemini_emotion.get_http_client().post(
+        f"/v1beta/models/{gemini_emotion.get_model_name()}:batchGenerateContent",
+        content=orjson.dumps(body),
+        params={"key": _token()},
+    )
+    if r.status_code >= 300:
+        raise RuntimeError(f"batchGenerateContent {r.status_code} :: {r.text[:300]}")
+    name = orjson.loads(r.content).get("name")
+    if not isinstance(name, str):
+        raise RuntimeError("batchGenerateContent returned no batch name")
+    return name
+
+def wait(name: str, poll_s: float = 60.0, timeout_s: float = 24 * 3600) -> Dict[str, Any]:
+    """Poll a batch job until it reaches a final state; returns the final job body."""
+    deadline: float = time.monotonic() + timeout_s
+    while True:
+        r = gemini_emotion.get_http_client().get(f"/v1beta/{name}", params={"key": _token()})
+        if r.status_code >= 300:
+            raise RuntimeError(f"batches.get {r.status_code} :: {r.text[:300]}")
+        job: Dict[str, Any] = orjson.loads(r.content)
+        state = (job.get("metadata") or {}).get("state")
+        if job.get("done") or state in _DONE_STATES:
+            if state not in (None, "BATCH_STATE_SUCCEEDED") or "error" in job:
+                raise RuntimeError(f"batch {name} finished as {state}: {job.get('error')}")
+            return job
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"batch {name} still {state} after {timeout_s:.0f}s")
+        time.sleep(poll_s)
+
+def collect(job: Dict[str, Any], top_k: int = 2) -> Dict[str, List[Tuple[str, int]]]:
+    """Map each mood of a finished job to its genres; unparsable answers are skipped."""
+    output = job.get("response") or (job.get("metadata") or {}).get("output") or {}
+    inlined = (output.get("inlinedResponses") or {}).get("inlinedResponses") or []
+    results: Dict[str, List[Tuple[str, int]]] = {}
+    for item in inlined:
+        mood = (item.get("metadata") or {}).get("key")
+        if not isinstance(mood, str) or "response" not in item:
+            continue
+        try:
+            results[mood] = gemini_emotion.parse_genres(item["response"], top_k)
+        except (RuntimeError, orjson.JSONDecodeError, TypeError):
+            continue
+    return results
+
+def load_warm_cache(path: str, top_k: int = 2) -> int:
+    """
+    Prime gemini_emotion with a file written by this module; returns entries loaded.
+    The warm cache is optional: an unreadable or malformed file is logged and skipped.
+    """
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path, "rb") as fh:
+            data: Dict[str, Any] = orjson.loads(fh.read())
+        return gemini_emotion.prime_cache(data.get("moods", {}), top_k=int(data.get("top_k", top_k)))
+    except (OSError, orjson.JSONDecodeError, AttributeError, TypeError, ValueError) as e:
+        logger.warning("Ignoring Gemini warm cache %s: %s", path, e)
+        return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args: List[str] = sys.argv[1:] if argv is None else argv
+    if args and args[0] != "-":
+        with open(args[0], encoding="utf-8") as fh:
+            moods = [line.strip() for line in fh if line.strip()]
+    else:
+        moods = list(FALLBACK_MAP.keys())
+    out_path: str = args[1] if len(args) > 1 else (settings.gemini_warm_cache_file or "gemini_warm_cache.json")
+    moods = list(dict.fromkeys(m.lower() for m in moods))  # normalize + de-duplicate, keep order
+
+    name = submit(moods)
+    print(f"submitted {name} ({len(moods)} moods); polling...")
+    results = collect(wait(name))
+    with open(out_path, "wb") as fh:
+        fh.write(orjson.dumps({"top_k": 2, "moods": results}, option=orjson.OPT_INDENT_2))
+    print(f"wrote {len(results)}/{len(moods)} moods to {out_path}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,50 @@
 # app/ai/gemini_emotion.py
 from __future__ import annotations
-from typing import List, Tuple, Dict, Optional
+from typing import Any, List, Tuple, Dict, Optional, Union
 
+import atexit
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import httpx
-import json
+import orjson
+from cachetools import TTLCache
 from ..config import settings
 from .genre_mapper import TMDB_GENRES
+from .microbatch import MicroBatcher
+
+# Label constants computed once instead of on every classification
+_LABELS: Tuple[str, ...] = tuple(TMDB_GENRES.keys())
+_LABELS_JOINED: str = ", ".join(_LABELS)
+_JSON_ARRAY_RE: re.Pattern[str] = re.compile(r"\[.*\]", re.S)
+
+# Default prompt template (module constant, not rebuilt per call)
+DEFAULT_PROMPT: str = (
+    "Given the mood or emotion '{mood}', select the most relevant movie genres from this list: {labels}.\n"
+    "Respond ONLY with a pure JSON array (no extra text, no code fences), containing the top {top_k} exact genre names.\n"
+    "Example: [\"Action\", \"Adventure\"]"
+)
+
+# Batched variant: one prompt, one answer array per mood. Moods go in as a JSON array so
+# user text (newlines, "2. ..." lines) can't add entries and shift the positional match
+BATCH_PROMPT: str = (
+    "For EACH of the {count} moods or emotions in this JSON array, select the most relevant movie genres "
+    "from this list: {labels}.\n"
+    "Moods: {moods}\n"
+    "Respond ONLY with a pure JSON array (no extra text, no code fences) holding exactly {count} entries, "
+    "one per mood, in the same order; each entry is an array with the top {top_k} exact genre names.\n"
+    "Example for two moods: [[\"Comedy\", \"Romance\"], [\"Drama\", \"War\"]]"
+)
+
+# Pooled client shared by every Gemini call (keep-alive avoids a TLS handshake per mood)
+_GEMINI_CLIENT: httpx.Client = httpx.Client(
+    base_url="https://generativelanguage.googleapis.com",
+    timeout=settings.request_timeout_s,
+    headers={"Content-Type": "application/json"},
+    limits=httpx.Limits(max_keepalive_connections=4),
+)
+# resolve the global at exit so a client swapped in by tests is the one closed
+atexit.register(lambda: _GEMINI_CLIENT.close())
 
 _last_error: Optional[str] = None
 MODEL_NAME: str = settings.gemini_model or "gemini-pro"  # gemini-pro is available on v1 generateContent
@@ -14,6 +53,15 @@ _last_raw_response: Optional[Dict[str, object]] = None
 _last_request_payload: Optional[Dict[str, object]] = None
 _available_models: List[str] = []
 _used_model: Optional[str] = None
+_last_cache_hit: bool = False  # last map_via_gemini_api call was answered from cache (no HTTP)
+# calls run on several worker threads: each fills a local record, then _publish swaps the debug globals at once
+_debug_lock: threading.Lock = threading.Lock()
+# successful classifications keyed by (normalized mood, top_k); errors are never cached
+_genre_cache: TTLCache[Tuple[str, int], List[Tuple[str, int]]] = TTLCache(maxsize=1024, ttl=3600)
+# TTLCache isn't thread-safe; it's written from batcher worker threads and read on the event loop
+_genre_cache_lock: threading.Lock = threading.Lock()
+# answers precomputed offline (see gemini_batch); never expire and are checked first
+_precomputed: Dict[Tuple[str, int], List[Tuple[str, int]]] = {}
 
 def get_last_error() -> Optional[str]:
     """Returns the last error message from the Gemini API call."""
@@ -39,8 +87,11 @@ def get_model_name() -> str:
     return MODEL_NAME
 
 def get_api_version() -> str:
+    return _api_version_for(MODEL_NAME)
+
+def _api_version_for(model: str) -> str:
     """Choose API version: 1.5/2.0 models typically live under v1beta."""
-    name = (MODEL_NAME or "").lower()
+    name = (model or "").lower()
     return "v1beta" if ("1.5" in name or "2.0" in name) else "v1"
 
 def get_available_models() -> List[str]:
@@ -49,37 +100,96 @@ def get_available_models() -> List[str]:
 def get_used_model() -> Optional[str]:
     return _used_model
 
-def _reset_state() -> None:
+def get_last_cache_hit() -> bool:
+    """True if the last call was served from cache, so no request/response was recorded."""
+    return _last_cache_hit
+
+def get_http_client() -> httpx.Client:
+    """Pooled client for generativelanguage.googleapis.com (shared with gemini_batch)."""
+    return _GEMINI_CLIENT
+
+def build_prompt(mood: str, top_k: int = 2) -> str:
+    """Classification prompt for one mood: the configured template, or DEFAULT_PROMPT if it is unusable."""
+    template = settings.gemini_prompt_template or DEFAULT_PROMPT
+    try:
+        return template.format(mood=mood, labels=_LABELS_JOINED, top_k=top_k)
+    except Exception:
+        # if user provided a bad template, fall back to default to avoid 500s
+        return DEFAULT_PROMPT.format(mood=mood, labels=_LABELS_JOINED, top_k=top_k)
+
+def parse_genres(response: object, top_k: int = 2) -> List[Tuple[str, int]]:
+    """
+    (genre_name, genre_id) pairs from a generateContent response body.
+    Raises RuntimeError or orjson.JSONDecodeError if the answer is unusable.
+    """
+    return _genres_from_text(_candidate_text(response), top_k)
+
+def prime_cache(results: Dict[str, List[Tuple[str, int]]], top_k: int = 2) -> int:
+    """
+    Seed mood -> genres answers computed offline. Returns how many were added.
+    All-or-nothing: a malformed entry raises before anything is stored.
+    """
+    entries: Dict[Tuple[str, int], List[Tuple[str, int]]] = {
+        (mood.strip().lower(), top_k): [(str(name), int(gid)) for name, gid in genres]
+        for mood, genres in results.items()
+    }
+    _precomputed.update(entries)
+    return len(entries)
+
+def _cached_genres(key: Tuple[str, int]) -> Optional[List[Tuple[str, int]]]:
+    """Precomputed or recently cached answer for (normalized mood, top_k), if any."""
+    hit = _precomputed.get(key)
+    if hit is not None:
+        return hit
+    with _genre_cache_lock:
+        return _genre_cache.get(key)
+
+def _store_genres(key: Tuple[str, int], genres: List[Tuple[str, int]]) -> None:
+    with _genre_cache_lock:
+        _genre_cache[key] = genres
+
+def _publish(record: Dict[str, Any]) -> None:
+    """
+    Replace every debug global from ONE call's record, under a lock, so concurrent
+    calls never leave one mood's payload next to another mood's response.
+    """
     global _last_error, _last_http_status, _last_raw_response, _last_request_payload
-    _last_error = None
-    _last_http_status = None
-    _last_raw_response = None
-    _last_request_payload = None
-    _available_models.clear()
-    global _used_model
-    _used_model = None
-
-def _list_models(token: str) -> None:
-    """Populate _available_models by querying model list endpoints."""
-    global _available_models
+    global _available_models, _used_model, _last_cache_hit
+    with _debug_lock:
+        _last_error = record.get("error")
+        _last_http_status = record.get("http_status")
+        _last_raw_response = record.get("raw_response")
+        _last_request_payload = record.get("request_payload")
+        _available_models = record.get("available_models") or []  # rebound, never mutated in place
+        _used_model = record.get("used_model")
+        _last_cache_hit = bool(record.get("cache_hit"))
+
+def _list_models(token: str) -> List[str]:
+    """Model ids from the model list endpoints (both versions in parallel)."""
     versions = ["v1", "v1beta"]
     names: List[str] = []
-    with httpx.Client(timeout=settings.request_timeout_s) as client:
-        for ver in versions:
-            try:
-                resp = client.get(f"https://generativelanguage.googleapis.com/{ver}/models", params={"key": token})
-                if resp.status_code == 200:
-                    body = resp.json()
-                    if isinstance(body, dict) and isinstance(body.get("models"), list):
-                        for m in body["models"]:  # type: ignore[index]
-                            if isinstance(m, dict) and isinstance(m.get("name"), str):
-                                names.append(m["name"].split('/')[-1])
-            except Exception:
-                continue
-    _available_models = sorted(set(names))
-
-def _choose_fallback_model() -> Optional[str]:
-    """Pick the best available text-gen model from the discovered list."""
+    with ThreadPoolExecutor(max_workers=len(versions)) as pool:
+        for found in pool.map(lambda ver: _model_names(ver, token), versions):
+            names.extend(found)
+    return sorted(set(names))
+
+def _model_names(version: str, token: str) -> List[str]:
+    """Model ids listed under one API version (empty on any error)."""
+    names: List[str] = []
+    try:
+        resp = _GEMINI_CLIENT.get(f"/{version}/models", params={"key": token})
+        if resp.status_code == 200:
+            body = orjson.loads(resp.content)
+            if isinstance(body, dict) and isinstance(body.get("models"), list):
+                for m in body["models"]:  # type: ignore[index]
+                    if isinstance(m, dict) and isinstance(m.get("name"), str):
+                        names.append(m["name"].split('/')[-1])
+    except Exception:
+        return []
+    return names
+
+def _choose_fallback_model(available: List[str], current: str) -> Optional[str]:
+    """Pick the best text-gen model from `available` other than `current`."""
     # Preference order: newest fast text models first, then 1.5, then pro
     preference = [
         "gemini-2.0-flash",
@@ -90,50 +200,154 @@ def _choose_fallback_model() -> Optional[str]:
         "gemini-pro",
     ]
     for p in preference:
-        if p in _available_models and p != MODEL_NAME:
+        if p in available and p != current:
             return p
     # Heuristic: any available 'flash' model
-    for m in _available_models:
-        if m.startswith("gemini-") and "flash" in m and m != MODEL_NAME:
+    for m in available:
+        if m.startswith("gemini-") and "flash" in m and m != current:
             return m
     # Next: any gemini text model
-    for m in _available_models:
-        if m.startswith("gemini-") and m != MODEL_NAME:
+    for m in available:
+        if m.startswith("gemini-") and m != current:
             return m
     return None
 
+def _candidate_text(data: object) -> str:
+    """
+    Extract the first candidate's text from a generateContent response body.
+    Raises RuntimeError describing the first malformed level.
+    """
+    # Validate candidates structure
+    if not isinstance(data, dict) or 'candidates' not in data:
+        raise RuntimeError("Missing 'candidates' in Gemini response")
+    candidates = data.get('candidates')
+    if not isinstance(candidates, list) or not candidates:
+        raise RuntimeError("Empty 'candidates' array in Gemini response")
+    first = candidates[0]
+    if not isinstance(first, dict):
+        raise RuntimeError("First candidate malformed")
+    content = first.get('content')
+    if not isinstance(content, dict):
+        raise RuntimeError("Candidate content missing")
+    parts = content.get('parts')
+    if not isinstance(parts, list) or not parts or not isinstance(parts[0], dict):
+        raise RuntimeError("Content parts missing or invalid")
+    return parts[0].get('text', '')
+
+def _genres_from_text(response_text: str, top_k: int) -> List[Tuple[str, int]]:
+    """
+    Parse the model's JSON-array answer into up to `top_k` valid (genre_name, genre_id).
+    Raises RuntimeError on a wrong shape, orjson.JSONDecodeError on invalid JSON.
+    """
+    return _valid_genres(_json_array(response_text), top_k)
+
+def _json_array(response_text: str) -> List[object]:
+    """
+    Decode the JSON array in a model answer. Raises RuntimeError if it isn't a list.
+    """
+    # Keep only the outermost JSON array (drops code fences or any surrounding prose)
+    m = _JSON_ARRAY_RE.search(response_text)
+    if m:
+        response_text = m.group(0)
+    selected = orjson.loads(response_text)
+
+    # Validate response format
+    if not isinstance(selected, list):
+        raise RuntimeError("Invalid response format: expected a list")
+    return selected
+
+def _valid_genres(selected_genres: List[object], top_k: int) -> List[Tuple[str, int]]:
+    """
+    Keep known genre names only, stopping as soon as `top_k` are found.
+    """
+    result: List[Tuple[str, int]] = []
+    for name in selected_genres:
+        gid = TMDB_GENRES.get(name)  # type: ignore[call-overload]
+        if gid is not None:
+            result.append((name, gid))  # type: ignore[arg-type]
+            if len(result) >= top_k:
+                break
+    if not result:
+        raise RuntimeError(f"No valid genres found in response: {selected_genres}")
+    return result
+
+def _generate(body: bytes, token: str, record: Dict[str, Any]) -> object:
+    """
+    POST a serialized generateContent payload to the current model and return the
+    parsed JSON body. On a model-not-found 404, lists the available models and
+    retries once on the best fallback, switching MODEL_NAME for later calls.
+    Raises RuntimeError on failure; debug details go to `record`, not the globals.
+    """
+    global MODEL_NAME
+    model: str = MODEL_NAME  # read once: another thread may switch it meanwhile
+    # Official REST style: API key as query param keeps it explicit.
+    params = {"key": token}
+
+    try:
+        r = _GEMINI_CLIENT.post(f"/{_api_version_for(model)}/models/{model}:generateContent", content=body, params=params)
+        record["http_status"] = r.status_code
+        data = orjson.loads(r.content)
+        record["raw_response"] = data  # store before any mutation
+    except httpx.HTTPError as he:  # network / protocol
+        raise RuntimeError(f"HTTP client error: {he}") from he
+    except Exception as e:
+        raise RuntimeError(f"Unexpected transport error: {e}") from e
+
+    # Non-2xx handling (Gemini returns JSON error object)
+    if r.status_code >= 300:
+        msg = None
+        if isinstance(data, dict):
+            err = data.get("error")
+            if isinstance(err, dict):
+                msg = err.get("message")
+        error = f"Gemini non-2xx ({r.status_code}): {msg or 'no message'}"
+        # Auto fallback attempt for common 404 model mismatch
+        if r.status_code != 404 or "not found" not in error.lower():
+            raise RuntimeError(error)
+        # list models and decide fallback target
+        available = _list_models(token)
+        record["available_models"] = available
+        target = _choose_fallback_model(available, model)
+        if not target:
+            raise RuntimeError(error)
+        # second attempt
+        try:
+            r2 = _GEMINI_CLIENT.post(
+                f"/{_api_version_for(target)}/models/{target}:generateContent",
+                content=body,
+                params=params,
+            )
+            record["http_status"] = r2.status_code
+            data = orjson.loads(r2.content)
+            record["raw_response"] = data
+        except Exception as e:
+            raise RuntimeError(error) from e
+        if r2.status_code >= 300:
+            raise RuntimeError(error)
+        MODEL_NAME = model = target  # update for subsequent calls
+
+    record["used_model"] = model
+    return data
+
 def map_via_gemini_api(mood: str, top_k: int = 2) -> List[Tuple[str, int]]:
     """
     Zero-shot classification via Google's Gemini API.
     Returns a list of (genre_name, genre_id).
     """
-    # declare globals up-front for any later assignments
-    global MODEL_NAME, _used_model
-    labels: List[str] = list(TMDB_GENRES.keys())
     token: str | None = settings.gemini_api_key
     if not token:
         raise RuntimeError("GEMINI_API_KEY not configured (HACK_GEMINI_API_KEY)")
 
-    # Gemini API endpoint
-    # Official REST style: API key as query param keeps it explicit.
-    api_version = get_api_version()
-    url = f"https://generativelanguage.googleapis.com/{api_version}/models/{MODEL_NAME}:generateContent"
-    params = {"key": token}
-    headers = {"Content-Type": "application/json"}
+    mood = mood.strip().lower()
+    cache_key: Tuple[str, int] = (mood, top_k)
+    cached = _cached_genres(cache_key)
+    if cached is not None:
+        # don't leave the previous call's status/error/response behind for the debug endpoint
+        _publish({"cache_hit": True})
+        return list(cached)
 
     # Construct prompt for Gemini from a customizable template
-    DEFAULT_PROMPT = (
-        "Given the mood or emotion '{mood}', select the most relevant movie genres from this list: {labels}.\n"
-        "Respond ONLY with a pure JSON array (no extra text, no code fences), containing the top {top_k} exact genre names.\n"
-        "Example: [\"Action\", \"Adventure\"]"
-    )
-
-    template = settings.gemini_prompt_template or DEFAULT_PROMPT
-    try:
-        prompt = template.format(mood=mood, labels=', '.join(labels), top_k=top_k)
-    except Exception:
-        # if user provided a bad template, fall back to default to avoid 500s
-        prompt = DEFAULT_PROMPT.format(mood=mood, labels=', '.join(labels), top_k=top_k)
+    prompt = build_prompt(mood, top_k)
 
     payload: Dict[str, object] = {
         "contents": [{
@@ -143,117 +357,116 @@ def map_via_gemini_api(mood: str, top_k: int = 2) -> List[Tuple[str, int]]:
         }]
     }
 
-    _reset_state()
-    global _last_http_status, _last_raw_response, _last_request_payload, _last_error
-    _last_request_payload = payload
+    record: Dict[str, Any] = {"request_payload": payload}
+    try:
+        data = _generate(orjson.dumps(payload), token, record)
+
+        # Check for structured API error object (should have been caught above but double guard)
+        if isinstance(data, dict) and 'error' in data:
+            error_msg = isinstance(data['error'], dict) and data['error'].get('message', 'Unknown Gemini API error')
+            raise RuntimeError(f"Gemini API error (post-parse): {error_msg}")
 
-    with httpx.Client(timeout=settings.request_timeout_s) as client:
-        try:
-            r = client.post(url, headers=headers, json=payload, params=params)
-            _last_http_status = r.status_code
-            data = r.json()
-            _last_raw_response = data  # store before any mutation
-        except httpx.HTTPError as he:  # network / protocol
-            _last_error = f"HTTP client error: {he}"
-            raise RuntimeError(_last_error) from he
-        except Exception as e:
-            _last_error = f"Unexpected transport error: {e}"
-            raise RuntimeError(_last_error) from e
-
-        # Non-2xx handling (Gemini returns JSON error object)
-        if _last_http_status and _last_http_status >= 300:
-            msg = None
-            if isinstance(_last_raw_response, dict):
-                err = _last_raw_response.get("error")  # type: ignore[arg-type]
-                if isinstance(err, dict):
-                    msg = err.get("message")
-            _last_error = f"Gemini non-2xx ({_last_http_status}): {msg or 'no message'}"
-            # Auto fallback attempt for common 404 model mismatch
-            if _last_http_status == 404 and "not found" in (_last_error.lower()):
-                # list models and decide fallback target
-                _list_models(token)
-                target = _choose_fallback_model()
-                if target:
-                    # second attempt
-                    fallback_version = "v1beta" if ("1.5" in target or "2.0" in target) else "v1"
-                    try:
-                        r2 = client.post(
-                            f"https://generativelanguage.googleapis.com/{fallback_version}/models/{target}:generateContent",
-                            headers=headers,
-                            json=payload,
-                            params=params,
-                        )
-                        _last_http_status = r2.status_code
-                        data = r2.json()
-                        _last_raw_response = data
-                        if _last_http_status < 300:
-                            MODEL_NAME = target  # update for subsequent calls
-                            _last_error = None
-                            _used_model = target
-                        else:
-                            raise RuntimeError(_last_error)
-                    except Exception:
-                        raise RuntimeError(_last_error)
-                else:
-                    raise RuntimeError(_last_error)
-            else:
-                raise RuntimeError(_last_error)
-        
         # Extract the response text and parse it as JSON
         try:
-            # Check for structured API error object (should have been caught above but double guard)
-            if isinstance(data, dict) and 'error' in data:
-                error_msg = isinstance(data['error'], dict) and data['error'].get('message', 'Unknown Gemini API error')
-                _last_error = f"Gemini API error (post-parse): {error_msg}"
-                raise RuntimeError(_last_error)
-
-            # Track used model for debug (already declared global at function start)
-            _used_model = MODEL_NAME
-
-            # Validate candidates structure
-            if not isinstance(data, dict) or 'candidates' not in data:
-                _last_error = "Missing 'candidates' in Gemini response"
-                raise RuntimeError(_last_error)
-            candidates = data.get('candidates')
-            if not isinstance(candidates, list) or not candidates:
-                _last_error = "Empty 'candidates' array in Gemini response"
-                raise RuntimeError(_last_error)
-            first = candidates[0]
-            if not isinstance(first, dict):
-                _last_error = "First candidate malformed"
-                raise RuntimeError(_last_error)
-            content = first.get('content')
-            if not isinstance(content, dict):
-                _last_error = "Candidate content missing"
-                raise RuntimeError(_last_error)
-            parts = content.get('parts')
-            if not isinstance(parts, list) or not parts or not isinstance(parts[0], dict):
-                _last_error = "Content parts missing or invalid"
-                raise RuntimeError(_last_error)
-            response_text = parts[0].get('text', '')
-            # Clean the response text (remove any markdown or extra text)
-            response_text = response_text.strip()
-            if response_text.startswith("```"):
-                response_text = response_text[response_text.find("["):response_text.rfind("]")+1]
-            selected_genres = json.loads(response_text)
-            
-            # Validate response format
-            if not isinstance(selected_genres, list):
-                _last_error = "Invalid response format: expected a list"
-                raise RuntimeError(_last_error)
-            
-            # Ensure all genres are valid
-            valid_genres = [g for g in selected_genres if g in TMDB_GENRES]
-            if not valid_genres:
-                _last_error = f"No valid genres found in response: {selected_genres}"
-                raise RuntimeError(_last_error)
-            
-            # Ensure we only take top_k genres
-            selected_genres = valid_genres[:top_k]
-            
-            # Convert to list of tuples with genre IDs
-            return [(name, TMDB_GENRES[name]) for name in selected_genres]
-            
-        except (KeyError, json.JSONDecodeError, IndexError, TypeError) as e:
-            _last_error = f"Failed to parse Gemini API response: {str(e)}"
-            raise RuntimeError(_last_error) from e
\ No newline at end of file
+            result = parse_genres(data, top_k)
+        except (KeyError, orjson.JSONDecodeError, IndexError, TypeError) as e:
+            raise RuntimeError(f"Failed to parse Gemini API response: {str(e)}") from e
+    except RuntimeError as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        _publish(record)
+
+    _store_genres(cache_key, result)
+    return list(result)
+
+def map_via_gemini_api_batch(moods: List[str], top_k: int = 2) -> List[Union[List[Tuple[str, int]], Exception]]:
+    """
+    Classify several (already-normalized) moods with ONE Gemini call.
+    Returns one entry per mood, in order: its genres, or the exception explaining
+    why that mood's answer was unusable. Transport/API errors, and an answer count that
+    doesn't match `moods`, raise for the whole batch.
+    """
+    token: str | None = settings.gemini_api_key
+    if not token:
+        raise RuntimeError("GEMINI_API_KEY not configured (HACK_GEMINI_API_KEY)")
+
+    prompt: str = BATCH_PROMPT.format(
+        count=len(moods), labels=_LABELS_JOINED, moods=orjson.dumps(moods).decode(), top_k=top_k
+    )
+    payload: Dict[str, object] = {"contents": [{"parts": [{"text": prompt}]}]}
+
+    record: Dict[str, Any] = {"request_payload": payload}
+    try:
+        data = _generate(orjson.dumps(payload), token, record)  # same model-404 fallback as single calls
+        try:
+            answers = _json_array(_candidate_text(data))
+        except (RuntimeError, orjson.JSONDecodeError, TypeError) as e:
+            raise RuntimeError(f"Failed to parse Gemini batch response: {e}") from e
+        if len(answers) != len(moods):
+            # answers are matched by position only: a wrong count means we can't tell whose is whose
+            raise RuntimeError(f"Gemini batch returned {len(answers)} answers for {len(moods)} moods")
+    except RuntimeError as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        _publish(record)
+
+    out: List[Union[List[Tuple[str, int]], Exception]] = []
+    for i, mood in enumerate(moods):
+        try:
+            answer = answers[i]
+            if not isinstance(answer, list):
+                raise RuntimeError(f"Invalid batch entry for {mood!r}: expected a list")
+            genres = _valid_genres(answer, top_k)
+        except (RuntimeError, TypeError) as e:
+            out.append(e if isinstance(e, RuntimeError) else RuntimeError(f"Unusable batch answer for {mood!r}: {e}"))
+            continue
+        _store_genres((mood, top_k), genres)
+        out.append(genres)
+    return out
+
+_FALLBACK_WORKERS: int = 8  # parallel per-mood calls when a batch can't be used
+
+def _classify_batch(requests: List[Tuple[str, int]]) -> List[Union[List[Tuple[str, int]], Exception]]:
+    """
+    MicroBatcher handler: one batched prompt for several (mood, top_k) requests,
+    falling back to concurrent per-mood calls if it fails. A custom
+    `gemini_prompt_template` only applies per mood, so batching is skipped then.
+    """
+    if len(requests) > 1 and not settings.gemini_prompt_template:
+        top_k: int = max(k for _, k in requests)
+        try:
+            answers = map_via_gemini_api_batch([mood for mood, _ in requests], top_k)
+            return [a if isinstance(a, Exception) else a[:k] for a, (_, k) in zip(answers, requests)]
+        except Exception:
+            pass  # fall through to individual calls
+    if len(requests) == 1:
+        return [_classify_one(requests[0])]
+    # concurrently: this runs in the batcher's only worker, so every other Gemini miss waits on it
+    with ThreadPoolExecutor(max_workers=min(len(requests), _FALLBACK_WORKERS)) as pool:
+        return list(pool.map(_classify_one, requests))
+
+def _classify_one(request: Tuple[str, int]) -> Union[List[Tuple[str, int]], Exception]:
+    mood, k = request
+    try:
+        return map_via_gemini_api(mood, k)
+    except Exception as e:
+        return e
+
+# moods arriving within 10 ms of each other share one Gemini round trip
+_gemini_batcher: MicroBatcher[Tuple[str, int], List[Tuple[str, int]]] = MicroBatcher(
+    _classify_batch, max_batch=16, window_s=0.01
+)
+
+async def map_via_gemini_async(mood: str, top_k: int = 2) -> List[Tuple[str, int]]:
+    """
+    Async entry point for request handlers: cached moods return immediately; cache
+    misses from concurrent requests are micro-batched into one Gemini call that
+    runs in a worker thread instead of blocking the event loop.
+    """
+    key: Tuple[str, int] = (mood.strip().lower(), top_k)
+    cached = _cached_genres(key)
+    if cached is not None:
+        return list(cached)
+    return list(await _gemini_batcher.submit(key))
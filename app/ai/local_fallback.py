@@ -1,6 +1,12 @@
 from __future__ import annotations
 from typing import List, Tuple, Dict, Optional
+import asyncio
+import heapq
+import threading
+from operator import itemgetter
+from cachetools import LRUCache
 from ..config import settings
+from .microbatch import MicroBatcher
 
 
 TMDB_GENRES: Dict[str, int] = {
@@ -10,6 +16,8 @@ TMDB_GENRES: Dict[str, int] = {
     "Science Fiction": 878, "TV Movie": 10770, "Thriller": 53, "War": 10752, "Western": 37,
 }
 
+_LABELS: Tuple[str, ...] = tuple(TMDB_GENRES.keys())
+
 FALLBACK_MAP: Dict[str, List[str]] = {
     "feliz": ["Comedy", "Romance"],
     "happy": ["Comedy", "Romance"],
@@ -23,15 +31,20 @@ FALLBACK_MAP: Dict[str, List[str]] = {
     "angry": ["Action"],
 }
 
+_ZS_MODEL: str = "facebook/bart-large-mnli"
 _zs: Optional[object] = None
+_zs_lock: threading.Lock = threading.Lock()  # one pipeline load even with concurrent first calls
+_zs_failed: bool = False  # a load that failed once isn't retried on every request
 _last_error: Optional[str] = None
+# zero-shot output is deterministic, so (mood, top_k) results never go stale
+_zs_cache: LRUCache[Tuple[str, int], List[Tuple[str, int]]] = LRUCache(maxsize=1024)
 
 def is_available() -> bool:
     """
     Returns True only if AI_MODE=local and transformers can be loaded.
     Otherwise, returns False WITHOUT trying to import transformers.
     """
-    global _zs, _last_error
+    global _zs, _zs_failed, _last_error
 
     # Short-circuit: if not explicitly local, don't even try to load transformers
     if (settings.ai_mode or "remote").lower() != "local":
@@ -40,14 +53,65 @@ def is_available() -> bool:
 
     if _zs is not None:
         return True
+    if _zs_failed:
+        return False
+    with _zs_lock:
+        if _zs is not None:
+            return True
+        if _zs_failed:
+            return False
+        try:
+            _zs = _load_pipeline()
+            return True
+        except Exception as e:
+            _last_error = str(e)
+            _zs_failed = True
+            return False
+
+def _load_pipeline() -> object:
+    """
+    Build the zero-shot pipeline. Prefers ONNX Runtime (via optimum) on CPU, loading
+    a pre-exported/quantized model from `local_onnx_model_dir` when configured;
+    falls back to the plain PyTorch pipeline when optimum isn't installed or the
+    ONNX load/export fails.
+    """
+    global _last_error
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer, pipeline
+    except ImportError:
+        return _torch_pipeline()
     try:
-        from transformers import pipeline
-        _zs = pipeline(
-            task="zero-shot-classification",
-            model="facebook/bart-large-mnli",   # safetensors-capable model
-            device_map="cpu",
-            model_kwargs={"use_safetensors": True, "low_cpu_mem_usage": True},
+        source: str = settings.local_onnx_model_dir or _ZS_MODEL
+        model = ORTModelForSequenceClassification.from_pretrained(
+            source,
+            export=not settings.local_onnx_model_dir,  # export on the fly only without a shipped artifact
+            provider="CPUExecutionProvider",
         )
+        tokenizer = AutoTokenizer.from_pretrained(_ZS_MODEL)  # quantized exports ship without tokenizer files
+        return pipeline(task="zero-shot-classification", model=model, tokenizer=tokenizer)
+    except Exception as e:  # bad local_onnx_model_dir, export error, no hub access...
+        _last_error = f"ONNX Runtime load failed, using PyTorch: {e}"
+        return _torch_pipeline()
+
+def _torch_pipeline() -> object:
+    from transformers import pipeline
+    return pipeline(
+        task="zero-shot-classification",
+        model=_ZS_MODEL,   # safetensors-capable model
+        device_map="cpu",
+        model_kwargs={"use_safetensors": True, "low_cpu_mem_usage": True},
+    )
+
+def warmup() -> bool:
+    """
+    Load the pipeline and run one throwaway inference so the first request is hot.
+    """
+    global _last_error
+    if not is_available():
+        return False
+    try:
+        _zs("warmup", candidate_labels=_LABELS, multi_label=True)  # type: ignore[operator]
         return True
     except Exception as e:
         _last_error = str(e)
@@ -76,11 +140,64 @@ def map_mood_to_genres(mood: str, top_k: int = 2) -> List[Tuple[str, int]]:
     Falls back to static mapping if transformers is unavailable.
     """
     if is_available():
-        assert _zs is not None  # for type checkers
-        labels: List[str] = list(TMDB_GENRES.keys())
-        res: Dict[str, List] = _zs(mood, candidate_labels=labels, multi_label=True)  # type: ignore[call-arg]
-        pairs: List[Tuple[str, float]] = sorted(
-            zip(res["labels"], res["scores"]), key=lambda x: x[1], reverse=True  # type: ignore[index]
-        )[:top_k]
-        return [(name, TMDB_GENRES[name]) for name, _ in pairs]
+        key: Tuple[str, int] = (mood.strip().lower(), top_k)
+        top = _zs_cache.get(key)
+        if top is None:
+            top = _classify(key[0], top_k)
+            _zs_cache[key] = top
+        return list(top)
     return fallback_genres_for(mood, top_k)
+
+def _classify(mood: str, top_k: int) -> List[Tuple[str, int]]:
+    """
+    Run the zero-shot pipeline for an already-normalized mood (no caching).
+    """
+    assert _zs is not None  # for type checkers
+    res: Dict[str, List] = _zs(mood, candidate_labels=_LABELS, multi_label=True)  # type: ignore[call-arg]
+    return _top_genres(res, top_k)
+
+def _classify_batch(requests: List[Tuple[str, int]]) -> List[List[Tuple[str, int]]]:
+    """
+    Run the zero-shot pipeline ONCE over several (normalized mood, top_k) requests.
+    """
+    assert _zs is not None  # for type checkers
+    moods: List[str] = [mood for mood, _ in requests]
+    res = _zs(moods, candidate_labels=_LABELS, multi_label=True, batch_size=_ZS_MAX_BATCH)  # type: ignore[call-arg]
+    if isinstance(res, dict):  # some transformers versions unwrap single-item lists
+        res = [res]
+    return [_top_genres(r, top_k) for r, (_, top_k) in zip(res, requests)]
+
+def _top_genres(res: Dict[str, List], top_k: int) -> List[Tuple[str, int]]:
+    """
+    Pick the `top_k` best-scored labels of one zero-shot result.
+    """
+    pairs: List[Tuple[str, float]] = heapq.nlargest(
+        top_k, zip(res["labels"], res["scores"]), key=itemgetter(1)  # type: ignore[index]
+    )
+    return [(name, TMDB_GENRES[name]) for name, _ in pairs]
+
+_ZS_MAX_BATCH: int = 16
+# moods arriving within 50 ms of each other share one forward pass
+_zs_batcher: MicroBatcher[Tuple[str, int], List[Tuple[str, int]]] = MicroBatcher(
+    _classify_batch, max_batch=_ZS_MAX_BATCH, window_s=0.05
+)
+
+async def map_moods_batch(moods: List[str], top_k: int = 2) -> List[List[Tuple[str, int]]]:
+    """
+    Async, batched counterpart of `map_mood_to_genres`: cache misses from all
+    concurrent callers are classified together in a worker thread.
+    Falls back to static mapping if transformers is unavailable.
+    """
+    available: bool = _zs is not None or await asyncio.to_thread(is_available)
+    if not available:
+        return [fallback_genres_for(mood, top_k) for mood in moods]
+
+    async def one(mood: str) -> List[Tuple[str, int]]:
+        key: Tuple[str, int] = (mood.strip().lower(), top_k)
+        top = _zs_cache.get(key)
+        if top is None:
+            top = await _zs_batcher.submit(key)
+            _zs_cache[key] = top
+        return list(top)
+
+    return list(await asyncio.gather(*(one(mood) for mood in moods)))
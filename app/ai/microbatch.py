@@ -0,0 +1,77 @@
+from __future__ import annotations
+import asyncio
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Groups items submitted within a short window and resolves them with ONE call
+    to a blocking `handler(items) -> results`, executed in a worker thread.
+    The handler returns one result per item, in order; an exception instance in
+    that list fails only the matching caller.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], List[Union[R, BaseException]]],
+        max_batch: int = 16,
+        window_s: float = 0.05,
+    ) -> None:
+        self.handler = handler
+        self.max_batch: int = max_batch
+        self.window_s: float = window_s
+        self._queue: Optional[asyncio.Queue[Tuple[T, asyncio.Future[R]]]] = None
+        self._worker: Optional[asyncio.Task[None]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, item: T) -> R:
+        """
+        Queue one item and wait for its result.
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop or self._worker is None or self._worker.done():
+            # start lazily, and again if we are now running on a different event loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        fut: asyncio.Future[R] = loop.create_future()
+        self._queue.put_nowait((item, fut))
+        return await fut
+
+    async def _run(self, queue: asyncio.Queue[Tuple[T, asyncio.Future[R]]]) -> None:
+        """
+        Drain the queue forever: wait for one item, then collect more until the
+        window closes or the batch is full.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[T, asyncio.Future[R]]] = [await queue.get()]
+            deadline: float = loop.time() + self.window_s
+            while len(batch) < self.max_batch:
+                remaining: float = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await asyncio.to_thread(self.handler, [item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch handler returned {len(results)} results for {len(batch)} items")
+            except Exception as e:  # noqa: BLE001
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            for (_, fut), res in zip(batch, results):
+                if fut.done():  # caller went away (cancelled)
+                    continue
+                if isinstance(res, BaseException):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
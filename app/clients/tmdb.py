@@ -1,44 +1,90 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
-import hashlib
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import asyncio
+import zlib
 import httpx
+import orjson
+from cachetools import TTLCache
 from tenacity import retry, stop_after_attempt, wait_exponential_jitter
 from ..config import settings
 
+try:
+    import h2  # noqa: F401  (pulled in by httpx[http2])
+    _HTTP2: bool = True
+except ImportError:  # plain httpx: stay on HTTP/1.1 instead of failing at client creation
+    _HTTP2 = False
+
 def _pick_page(seed: str, max_pages: int = 5) -> int:
     """
     Deterministically choose a page number (1..max_pages) from a seed string.
     """
-    h: str = hashlib.sha256(seed.encode("utf-8")).hexdigest()
-    return (int(h[:8], 16) % max_pages) + 1
+    return (zlib.crc32(seed.encode("utf-8")) % max_pages) + 1
 
 def _pick_sort(seed: str) -> str:
     """
     Deterministically choose a sort criterion from a seed string.
     """
+    if not seed:
+        return "popularity.desc"
     return "vote_average.desc" if ord(seed[0]) % 2 == 0 else "popularity.desc"
 
+def _to_rows(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Trim raw TMDB movies to {title, score in [0, 1], id} rows.
+    """
+    return [
+        {
+            "title": m.get("title") or m.get("name") or "Desconhecido",
+            "score": min(1.0, max(0.0, float(m.get("vote_average") or 0.0) / 10.0)),
+            "id": m.get("id"),
+        }
+        for m in results
+    ]
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Pooled AsyncClient preconfigured for TMDB (base URL, timeout, v3 api_key param).
+    HTTP/2 lets the provider fan-out multiplex over a single TLS connection.
+    """
+    v3_key: str = (settings.tmdb_v3_key or "").strip()
+    return httpx.AsyncClient(
+        http2=_HTTP2,
+        base_url=settings.movies_api_base.rstrip("/"),
+        timeout=httpx.Timeout(settings.request_timeout_s),
+        headers={"Accept": "application/json"},
+        params={"api_key": v3_key} if v3_key else None,  # merged into every request by httpx
+        limits=httpx.Limits(max_keepalive_connections=30, max_connections=30),
+    )
+
 class TMDBClient:
     """
     Minimal typed adapter for TMDB (v3 key as query param).
     """
 
-    def __init__(self) -> None:
-        self.base: str = settings.movies_api_base.rstrip("/")
-        self.timeout: httpx.Timeout = httpx.Timeout(settings.request_timeout_s)
-        self.v3_key: str = (settings.tmdb_v3_key or "").strip()
-
-    def _headers(self) -> Dict[str, str]:
-        """
-        Common headers for all requests.
-        """
-        return {"Accept": "application/json"}
+    def __init__(self, client: Optional[httpx.AsyncClient] = None) -> None:
+        # One pooled client per adapter (or an injected, app-wide one): keeps TCP/TLS sessions alive
+        self._owns_client: bool = client is None
+        self._client: httpx.AsyncClient = client or create_http_client()
+        # bounds provider lookups across ALL concurrent requests, not just one fan-out
+        self._providers_sem: asyncio.Semaphore = asyncio.Semaphore(10)
+        # TMDB listings are stable for minutes, provider lists for days
+        self._discover_cache: TTLCache[Tuple[Tuple[int, ...], int, str], List[Dict[str, Any]]] = TTLCache(maxsize=2048, ttl=600)
+        self._providers_cache: TTLCache[Tuple[int, str], List[str]] = TTLCache(maxsize=10_000, ttl=86400)
+        # provider lookups still running, incl. ones a caller stopped waiting for; they finish in
+        # the background, fill _providers_cache and are reused by later requests for the same id
+        self._providers_inflight: Dict[Tuple[int, str], asyncio.Task[List[str]]] = {}
 
-    def _params(self) -> Dict[str, str]:
+    async def aclose(self) -> None:
         """
-        Authentication parameters for v3 API key.
+        Cancel background provider lookups and release pooled connections (call on
+        application shutdown); injected clients are left to their owner.
         """
-        return {"api_key": self.v3_key} if self.v3_key else {}
+        pending: List[asyncio.Task[List[str]]] = list(self._providers_inflight.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)  # let them unwind before the pool closes
+        if self._owns_client:
+            await self._client.aclose()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential_jitter(0.1, 0.6))
     async def search_by_mood(self, mood: str) -> List[Dict[str, Any]]:
@@ -46,65 +92,119 @@ class TMDBClient:
         Fallback text search when genre-based discover returns empty.
         """
         q: str = mood
-        async with httpx.AsyncClient(timeout=self.timeout, headers=self._headers()) as client:
-            params: Dict[str, Any] = {"query": q, "include_adult": "false", "language": "pt-BR", "page": 1}
-            params.update(self._params())
-            r: httpx.Response = await client.get(f"{self.base}/search/movie", params=params)
-            if r.status_code >= 400:
-                raise RuntimeError(f"/search/movie {r.status_code} :: {str(r.url)} :: {r.text[:300]}")
-            payload: Dict[str, Any] = r.json()
-            results: List[Dict[str, Any]] = payload.get("results", [])
-
-        out: List[Dict[str, Any]] = []
-        for m in results[:10]:
-            title: str = m.get("title") or m.get("name") or "Desconhecido"
-            vote: float = float(m.get("vote_average") or 0.0)
-            score: float = max(0.0, min(1.0, vote / 10.0))
-            out.append({"title": title, "score": score, "id": m.get("id")})
-        return out
+        params: Dict[str, Any] = {"query": q, "include_adult": "false", "language": "pt-BR", "page": 1}
+        r: httpx.Response = await self._client.get("/search/movie", params=params)
+        if r.status_code >= 400:
+            raise RuntimeError(f"/search/movie {r.status_code} :: {str(r.url)} :: {r.text[:300]}")
+        payload: Dict[str, Any] = orjson.loads(r.content)
+        results: List[Dict[str, Any]] = payload.get("results", [])
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential_jitter(0.1, 0.6))
-    async def discover_by_genres(self, genre_ids: List[int], seed: str) -> List[Dict[str, Any]]:
+        return _to_rows(results[:10])
+
+    async def discover_by_genres(self, genre_ids: Sequence[int], seed: str) -> List[Dict[str, Any]]:
         """
         Genre-first discovery with deterministic diversity (page/sort).
+        Results are cached per (genres, page, sort) for a few minutes; genre order
+        doesn't change the TMDB query, so [18, 35] and [35, 18] share an entry.
         """
-        gid: str = ",".join(str(g) for g in genre_ids)
         page: int = _pick_page(seed, max_pages=5)
         sort_by: str = _pick_sort(seed)
-        async with httpx.AsyncClient(timeout=self.timeout, headers=self._headers()) as client:
-            params: Dict[str, Any] = {
-                "with_genres": gid,
-                "sort_by": sort_by,
-                "vote_count.gte": 200,
-                "language": "pt-BR",
-                "page": page,
-            }
-            params.update(self._params())
-            r: httpx.Response = await client.get(f"{self.base}/discover/movie", params=params)
-            if r.status_code >= 400:
-                raise RuntimeError(f"/discover/movie {r.status_code} :: {str(r.url)} :: {r.text[:300]}")
-            payload: Dict[str, Any] = r.json()
-            results: List[Dict[str, Any]] = payload.get("results", [])[:10]
-
-        out: List[Dict[str, Any]] = []
-        for m in results:
-            title: str = m.get("title") or m.get("name") or "Desconhecido"
-            vote: float = float(m.get("vote_average") or 0.0)
-            score: float = max(0.0, min(1.0, vote / 10.0))
-            out.append({"title": title, "score": score, "id": m.get("id")})
-        return out
+        genres: Tuple[int, ...] = tuple(sorted(genre_ids))
+        key: Tuple[Tuple[int, ...], int, str] = (genres, page, sort_by)
+        rows = self._discover_cache.get(key)
+        if rows is None:
+            rows = await self._discover(genres, page, sort_by)
+            self._discover_cache[key] = rows
+        return list(rows)
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential_jitter(0.1, 0.6))
+    async def _discover(self, genre_ids: Sequence[int], page: int, sort_by: str) -> List[Dict[str, Any]]:
+        """
+        Uncached /discover/movie call.
+        """
+        gid: str = ",".join(str(g) for g in genre_ids)
+        params: Dict[str, Any] = {
+            "with_genres": gid,
+            "sort_by": sort_by,
+            "vote_count.gte": 200,
+            "language": "pt-BR",
+            "page": page,
+        }
+        r: httpx.Response = await self._client.get("/discover/movie", params=params)
+        if r.status_code >= 400:
+            raise RuntimeError(f"/discover/movie {r.status_code} :: {str(r.url)} :: {r.text[:300]}")
+        payload: Dict[str, Any] = orjson.loads(r.content)
+        results: List[Dict[str, Any]] = payload.get("results", [])[:10]
+
+        return _to_rows(results)
+
     async def get_watch_providers(self, movie_id: int) -> List[str]:
-        """Fetch streaming providers for a movie ID (TMDB watch/providers endpoint)."""
+        """
+        Fetch streaming providers for a movie ID (TMDB watch/providers endpoint), cached per region.
+        Goes through the same semaphore and in-flight map as get_watch_providers_many.
+        """
         region: str = (settings.tmdb_region or "US").upper()
-        async with httpx.AsyncClient(timeout=self.timeout, headers=self._headers()) as client:
-            params: Dict[str, Any] = {}
-            params.update(self._params())
-            r: httpx.Response = await client.get(f"{self.base}/movie/{movie_id}/watch/providers", params=params)
-            if r.status_code >= 400:
-                raise RuntimeError(f"/movie/{movie_id}/watch/providers {r.status_code} :: {str(r.url)} :: {r.text[:200]}")
-            data: Dict[str, Any] = r.json() or {}
+        providers = self._providers_cache.get((movie_id, region))
+        if providers is None:
+            # shield: the lookup may be shared, so this caller's cancellation must not stop it
+            providers = await asyncio.shield(self._providers_lookup(movie_id, region))
+        return list(providers)
+
+    async def get_watch_providers_many(self, movie_ids: List[int]) -> Dict[int, Optional[List[str]]]:
+        """
+        Fetch providers for several movies concurrently; cached and duplicate ids cost no request.
+        A failed lookup maps to None so one bad title doesn't sink the others. Lookups still
+        running after `tmdb_providers_timeout_s` are left OUT of the result but keep running,
+        so their providers are cached for the next request.
+        """
+        region: str = (settings.tmdb_region or "US").upper()
+        out: Dict[int, Optional[List[str]]] = {}
+        tasks: Dict[asyncio.Task[List[str]], int] = {}
+        for movie_id in dict.fromkeys(movie_ids):
+            hit = self._providers_cache.get((movie_id, region))
+            if hit is None:
+                tasks[self._providers_lookup(movie_id, region)] = movie_id
+            else:
+                out[movie_id] = list(hit)  # cached: no task, no semaphore slot
+
+        if not tasks:
+            return out
+        # asyncio.wait never cancels: laggards only stop holding up this response
+        done, _pending = await asyncio.wait(tasks, timeout=settings.tmdb_providers_timeout_s)
+        for t in done:
+            out[tasks[t]] = None if t.cancelled() or t.exception() is not None else list(t.result())
+        return out
+
+    def _providers_lookup(self, movie_id: int, region: str) -> asyncio.Task[List[str]]:
+        """
+        Running lookup for (movie_id, region), started if needed; held in _providers_inflight until done.
+        """
+        key: Tuple[int, str] = (movie_id, region)
+        task = self._providers_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_providers(movie_id, region))
+            self._providers_inflight[key] = task
+            task.add_done_callback(lambda t: self._lookup_done(key, t))
+        return task
+
+    def _lookup_done(self, key: Tuple[int, str], task: asyncio.Task[List[str]]) -> None:
+        self._providers_inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved: a failed background lookup isn't worth a warning
+
+    async def _fetch_providers(self, movie_id: int, region: str) -> List[str]:
+        async with self._providers_sem:
+            providers = await self._watch_providers(movie_id, region)
+        self._providers_cache[(movie_id, region)] = providers
+        return providers
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential_jitter(0.1, 0.6))
+    async def _watch_providers(self, movie_id: int, region: str) -> List[str]:
+        """Uncached /movie/{id}/watch/providers call."""
+        r: httpx.Response = await self._client.get(f"/movie/{movie_id}/watch/providers")
+        if r.status_code >= 400:
+            raise RuntimeError(f"/movie/{movie_id}/watch/providers {r.status_code} :: {str(r.url)} :: {r.text[:200]}")
+        data: Dict[str, Any] = orjson.loads(r.content) or {}
         results: Dict[str, Any] = data.get("results", {}) if isinstance(data, dict) else {}
         entry: Dict[str, Any] = results.get(region) or results.get("US") or {}
         flat: List[str] = []
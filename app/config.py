@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict  # ⬅️ use SettingsConfigDict (v2 style)
 
 class Settings(BaseSettings):
@@ -17,14 +17,22 @@ class Settings(BaseSettings):
 
     # AI configuration
     ai_mode: str | None = "remote"     # remote | local | off
+    # Local zero-shot: directory with an ONNX export (optionally INT8-quantized) of the model
+    local_onnx_model_dir: Optional[str] = None
     # Gemini
     gemini_api_key: str | None = None
     gemini_model: Optional[str] = None  # e.g., 'gemini-pro' (v1) or 'gemini-1.5-flash' (v1beta)
     # Optional custom prompt template for Gemini. Use placeholders: {mood}, {labels}, {top_k}
     gemini_prompt_template: Optional[str] = None
+    # JSON file written by `python -m app.ai.gemini_batch`; loaded at startup to pre-warm the mood cache
+    gemini_warm_cache_file: Optional[str] = None
     # Watch providers (TMDB)
     tmdb_region: Optional[str] = "BR"  # ISO 3166-1 code defaulting to Brazil
     tmdb_include_providers: bool = False  # enable to fetch streaming providers per title
+    # upper bound (seconds) on waiting for provider lookups; laggards come back without providers. None waits for all
+    tmdb_providers_timeout_s: Optional[float] = 0.5
+    # Admin
+    admin_token: Optional[str] = None  # enables POST /_debug/reload-config (sent as X-Admin-Token)
 
 
     # ⬇️ THIS is the important bit for pydantic-settings v2
@@ -34,3 +42,20 @@ class Settings(BaseSettings):
     )
 
 settings: Settings = Settings()
+
+# settings that take effect when reloaded at runtime; the rest is baked into clients/constants at startup
+RELOADABLE_FIELDS: Tuple[str, ...] = ("ai_mode", "tmdb_include_providers")
+
+def reload_settings() -> Dict[str, Any]:
+    """
+    Re-read env/.env and copy ONLY the RELOADABLE_FIELDS into the existing `settings`
+    object. Returns the fields whose value changed (name -> new value).
+    """
+    fresh: Settings = Settings()
+    changed: Dict[str, Any] = {}
+    for name in RELOADABLE_FIELDS:
+        value = getattr(fresh, name)
+        if getattr(settings, name) != value:
+            setattr(settings, name, value)
+            changed[name] = value
+    return changed
@@ -1,12 +1,19 @@
 from __future__ import annotations
-from typing import Dict, Any, Annotated
-from fastapi import FastAPI, Query, HTTPException
+import asyncio
+import logging
+import secrets
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Annotated, AsyncIterator, Optional
+from fastapi import FastAPI, Header, Query, HTTPException, Request, Response
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import ORJSONResponse
 from tenacity import RetryError
 
-from .config import settings
+from .config import settings, reload_settings, RELOADABLE_FIELDS
 from .models import RecommendationList
-from .services.recommendation_service import RecommendationService
+from .services.recommendation_service import RecommendationService, refresh_settings
 
+from .ai import gemini_batch
 from .ai.gemini_emotion import (
     map_via_gemini_api,
     get_last_error as get_gemini_error,
@@ -17,27 +24,79 @@ from .ai.gemini_emotion import (
     get_api_version,
     get_available_models,
     get_used_model,
+    get_last_cache_hit,
 )
 
 
 # debug helpers
-from .clients.tmdb import TMDBClient
+from .clients.tmdb import TMDBClient, create_http_client
 from .ai.genre_mapper import (
     is_available,
     last_error,
     fallback_genres_for,
     map_mood_to_genres,
+    warmup as warmup_local_model,
 )
 
 
-app: FastAPI = FastAPI(title=settings.app_name, version="0.1.0")
-service: RecommendationService = RecommendationService()
+logger: logging.Logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Startup/shutdown: one TMDB connection pool shared by the service and
+    the debug endpoints, plus optional AI warmups.
+    """
+    async with create_http_client() as http:
+        app.state.tmdb = TMDBClient(client=http)
+        app.state.service = RecommendationService(tmdb=app.state.tmdb)
+        # load the local zero-shot model before the first request (AI_MODE=local only)
+        if (settings.ai_mode or "remote").lower() == "local":
+            await asyncio.to_thread(warmup_local_model)
+        if settings.gemini_warm_cache_file:
+            gemini_batch.load_warm_cache(settings.gemini_warm_cache_file)
+        try:
+            yield
+        finally:
+            # cancel background provider lookups before the shared pool closes under them
+            await app.state.tmdb.aclose()
+
+app: FastAPI = FastAPI(
+    title=settings.app_name,
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson encodes responses straight to bytes
+)
+
+_RECOMMENDATION_EXAMPLE: Dict[str, Any] = {
+    "items": [
+        {"title": "Amélie", "source": "TMDB", "score": 0.82, "providers": ["Netflix", "Prime Video"]},
+        {"title": "La La Land", "source": "TMDB", "score": 0.87, "providers": ["Disney Plus"]},
+    ]
+}
+
+def custom_openapi() -> Dict[str, Any]:
+    """
+    Build the OpenAPI schema on the first /openapi.json request, adding the
+    RecommendationList example there instead of on the model itself.
+    """
+    if app.openapi_schema:
+        return app.openapi_schema
+    schema: Dict[str, Any] = get_openapi(title=app.title, version=app.version, routes=app.routes)
+    model_schema = schema.get("components", {}).get("schemas", {}).get("RecommendationList")
+    if model_schema is not None:
+        model_schema["examples"] = [_RECOMMENDATION_EXAMPLE]
+    app.openapi_schema = schema
+    return schema
+
+app.openapi = custom_openapi  # type: ignore[method-assign]
 
 @app.get("/health")
 def health() -> Dict[str, str]:
     """Simple liveness probe."""
-    print("TMDB v3 key present?", bool(settings.tmdb_v3_key and settings.tmdb_v3_key.strip()))
-    print("TMDB base:", settings.movies_api_base)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("TMDB v3 key present? %s", bool(settings.tmdb_v3_key and settings.tmdb_v3_key.strip()))
+        logger.debug("TMDB base: %s", settings.movies_api_base)
     return {"status": "ok"}
 
 MoodParam = Annotated[
@@ -50,18 +109,19 @@ MoodParam = Annotated[
 ]
 
 @app.get("/recommendations", response_model=RecommendationList)
-async def recommendations(mood: MoodParam) -> RecommendationList:
+async def recommendations(request: Request, mood: MoodParam) -> Response:
     """
     Main endpoint: accepts a free-text mood and returns recommendations.
+    The body is the JSON cached with the result, so hits skip Pydantic entirely;
+    response_model is kept for the OpenAPI schema only.
     """
-    return await service.recommend_by_mood(mood)
-
-dbg_tmdb: TMDBClient = TMDBClient()
+    service: RecommendationService = request.app.state.service
+    return Response(content=await service.recommend_by_mood_json(mood), media_type="application/json")
 
 @app.get("/_debug/config")
 def debug_config() -> Dict[str, Any]:
     """Debug endpoint to show current configuration."""
-    print("Debug config endpoint called")
+    logger.debug("Debug config endpoint called")
     return {
         "ai_mode": settings.ai_mode,
         "gemini_api_key_present": bool(settings.gemini_api_key),
@@ -74,15 +134,31 @@ def debug_config() -> Dict[str, Any]:
         "tmdb_v3_key_present": bool(settings.tmdb_v3_key),
     }
 
+@app.post("/_debug/reload-config")
+def debug_reload_config(x_admin_token: Annotated[Optional[str], Header()] = None) -> Dict[str, Any]:
+    """
+    Re-read env/.env for the runtime-reloadable settings only (ai_mode, tmdb_include_providers);
+    anything else needs a restart. Disabled unless HACK_ADMIN_TOKEN is set; requires X-Admin-Token.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    changed: Dict[str, Any] = reload_settings()
+    if changed:  # only then drop the recommendation cache
+        refresh_settings()
+        logger.info("Configuration reloaded: %s", changed)
+    return {"changed": sorted(changed), **{name: getattr(settings, name) for name in RELOADABLE_FIELDS}}
+
 @app.get("/_debug/checks")
-async def debug_checks(mood: str = "feliz") -> Dict[str, Any]:
+async def debug_checks(request: Request, mood: str = "feliz") -> Dict[str, Any]:
     """
     Diagnostics that respect AI mode:
       - ai_mode: remote | local | off
       - local_available: only meaningful when ai_mode=local
       - remote_ok: True if remote call succeeded
     """
-    print("DEBUG AI_MODE:", settings.ai_mode)
+    logger.debug("DEBUG AI_MODE: %s", settings.ai_mode)
     try:
         ai_mode = (settings.ai_mode or "remote").lower()
         local_available = False
@@ -102,23 +178,16 @@ async def debug_checks(mood: str = "feliz") -> Dict[str, Any]:
             genres_ia = []
 
         genres_fb = fallback_genres_for(mood, 2)
+        dbg_tmdb: TMDBClient = request.app.state.tmdb
         tmdb_try = await dbg_tmdb.discover_by_genres([35], seed=mood)
 
         raw_resp = get_last_raw_response()
         # Only show a compact snippet to avoid huge payloads in debug
-        raw_snippet = None
-        if isinstance(raw_resp, dict):
-            # try to extract the first candidate text for quick inspection
-            try:
-                cand = raw_resp.get("candidates")
-                if isinstance(cand, list) and cand:
-                    content = cand[0].get("content") if isinstance(cand[0], dict) else None
-                    parts = content.get("parts") if isinstance(content, dict) else None
-                    if isinstance(parts, list) and parts and isinstance(parts[0], dict):
-                        txt = parts[0].get("text", "")
-                        raw_snippet = txt[:200]
-            except Exception:  # noqa: BLE001
-                raw_snippet = None
+        # (first candidate text only; any unexpected shape, including no response yet, gives None)
+        try:
+            raw_snippet = raw_resp["candidates"][0]["content"]["parts"][0].get("text", "")[:200]
+        except (KeyError, TypeError, IndexError, AttributeError):
+            raw_snippet = None
 
         return {
             "ai_mode": ai_mode,
@@ -129,6 +198,7 @@ async def debug_checks(mood: str = "feliz") -> Dict[str, Any]:
             "gemini_request_payload": get_last_request_payload(),
             "gemini_raw_snippet": raw_snippet,
             "gemini_api_version": get_api_version(),
+            "gemini_cache_hit": get_last_cache_hit(),
             "gemini_model_effective": get_used_model() or get_model_name(),
             "gemini_models_available": get_available_models()[:10],
             "genres_ia": genres_ia,
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
+from typing import List
 from pydantic import BaseModel, Field
 
 class Recommendation(BaseModel):
@@ -17,13 +17,3 @@ class RecommendationList(BaseModel):
     """
     items: List[Recommendation]
 
-    model_config: Dict[str, Any] = {
-        "json_schema_extra": {
-            "examples": [{
-                "items": [
-                    {"title": "Amélie", "source": "TMDB", "score": 0.82, "providers": ["Netflix", "Prime Video"]},
-                    {"title": "La La Land", "source": "TMDB", "score": 0.87, "providers": ["Disney Plus"]}
-                ]
-            }]
-        }
-    }
@@ -1,71 +1,127 @@
 from __future__ import annotations
-from typing import List
+import asyncio
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from cachetools import TTLCache
 from ..models import Recommendation, RecommendationList
 from ..clients.tmdb import TMDBClient
 from ..ai import genre_mapper, gemini_emotion  # import modules, not functions to avoid circular imports
 from ..config import settings
 
-tmdb: TMDBClient = TMDBClient()
-cache: TTLCache[str, RecommendationList] = TTLCache(maxsize=512, ttl=600)
+# keyed by normalized mood; the value keeps the model and its JSON bytes, encoded once per miss
+cache: TTLCache[str, Tuple[RecommendationList, bytes]] = TTLCache(maxsize=512, ttl=600)
+
+_DEFAULT_GENRES: Tuple[int, ...] = (35,)  # Comedy, when the mapper finds nothing
+
+# hot-path settings, read once; call refresh_settings() when config.reload_settings() changes them
+_AI_MODE: str = (settings.ai_mode or "remote").lower()
+_INCLUDE_PROV: bool = bool(settings.tmdb_include_providers)
+
+def refresh_settings() -> None:
+    """
+    Re-capture the hot-path settings from `settings` and drop results computed under the old ones.
+    """
+    global _AI_MODE, _INCLUDE_PROV
+    _AI_MODE = (settings.ai_mode or "remote").lower()
+    _INCLUDE_PROV = bool(settings.tmdb_include_providers)
+    cache.clear()
+
+def _movie_id(row: Dict[str, Any]) -> Optional[int]:
+    """
+    Normalize a TMDB row id to int when possible (TMDB returns int, but be defensive).
+    """
+    mid = row.get("id")
+    if isinstance(mid, int):
+        return mid
+    if isinstance(mid, str):
+        try:
+            return int(mid)
+        except ValueError:
+            return None
+    return None
 
 class RecommendationService:
     """
     Business service that coordinates AI mapping, TMDB calls and caching.
     """
 
+    def __init__(self, tmdb: Optional[TMDBClient] = None) -> None:
+        self.tmdb: TMDBClient = tmdb or TMDBClient()
+        # cache misses currently being computed, so concurrent identical moods share one pipeline run
+        self._inflight: Dict[str, asyncio.Task[Tuple[RecommendationList, bytes]]] = {}
+
     async def recommend_by_mood(self, mood: str) -> RecommendationList:
         """
         Recommend movies given a free-text mood.
         """
+        return (await self._cached_or_compute(mood))[0]
+
+    async def recommend_by_mood_json(self, mood: str) -> bytes:
+        """
+        Same as `recommend_by_mood`, but returns the pre-encoded JSON body.
+        """
+        return (await self._cached_or_compute(mood))[1]
+
+    async def _cached_or_compute(self, mood: str) -> Tuple[RecommendationList, bytes]:
+        """
+        Cache lookup, sharing one in-flight pipeline run per normalized mood on a miss.
+        """
         seed: str = mood.lower().strip()
-        key: str = f"recs:{seed}"
-        if key in cache:
-            return cache[key]
+        cached = cache.get(seed)  # single lookup; hits return the stored entry as-is
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(seed)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(seed, mood))
+            self._inflight[seed] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(seed, None))
+        # shield: one caller disconnecting must not cancel the run the others are awaiting
+        return await asyncio.shield(task)
 
+    async def _compute(self, seed: str, mood: str) -> Tuple[RecommendationList, bytes]:
+        """
+        Full AI + TMDB pipeline for a cache miss; stores the result under `seed`.
+        """
         items: List[Recommendation] = []
+        complete: bool = True
         try:
-            mode = (settings.ai_mode or "remote").lower()
+            mode = _AI_MODE
             if mode == "off":
                 top = genre_mapper.fallback_genres_for(mood, top_k=2)
             elif mode == "remote":
                 try:
-                    top = gemini_emotion.map_via_gemini_api(mood, top_k=2)   # 🚀 remote, using Gemini
+                    top = await gemini_emotion.map_via_gemini_async(mood, top_k=2)   # 🚀 remote, using Gemini (micro-batched)
                 except Exception:
                     top = genre_mapper.fallback_genres_for(mood, top_k=2)    # graceful fallback
             else:  # "local"
-                if genre_mapper.is_available():
-                    top = genre_mapper.map_mood_to_genres(mood, top_k=2)     # local transformers (optional)
-                else:
-                    top = genre_mapper.fallback_genres_for(mood, top_k=2)
-            genre_ids: List[int] = [gid for _, gid in (top or [])] or [35]  # default to Comedy
-            rows = await tmdb.discover_by_genres(genre_ids, seed=seed)
+                # local transformers (optional), micro-batched with concurrent requests; falls back to static map
+                top = (await genre_mapper.map_moods_batch([mood], top_k=2))[0]
+            genre_ids: Sequence[int] = [gid for _, gid in top] if top else _DEFAULT_GENRES
+            rows = await self.tmdb.discover_by_genres(genre_ids, seed=seed)
             if not rows:
-                rows = await tmdb.search_by_mood(mood)
-            include_prov: bool = bool(settings.tmdb_include_providers)
-            for r in rows:
-                providers = None
-                mid = r.get("id")
-                # Normalize id to int when possible (TMDB returns int, but be defensive)
-                if include_prov:
-                    mid_int = None
-                    if isinstance(mid, int):
-                        mid_int = mid
-                    elif isinstance(mid, str):
-                        try:
-                            mid_int = int(mid)
-                        except Exception:
-                            mid_int = None
-                    if isinstance(mid_int, int):
-                        try:
-                            providers = await tmdb.get_watch_providers(mid_int)
-                        except Exception:
-                            providers = None  # silent fail, keep rec resilient
-                items.append(Recommendation(title=str(r["title"]), source="TMDB", score=float(r["score"]), providers=providers))
+                rows = await self.tmdb.search_by_mood(mood)
+            providers_by_id: Dict[int, Optional[List[str]]] = {}
+            if _INCLUDE_PROV:
+                ids: List[int] = [mid for mid in map(_movie_id, rows) if mid is not None]
+                providers_by_id = await self.tmdb.get_watch_providers_many(ids)  # failures come back as None
+                complete = all(mid in providers_by_id for mid in ids)  # timed-out lookups are absent
+            # rows come from our own TMDB client (score already a float clamped to [0, 1]),
+            # so skip per-item Pydantic validation
+            items = [
+                Recommendation.model_construct(
+                    title=str(r["title"]),
+                    source="TMDB",
+                    score=r["score"],
+                    providers=providers_by_id.get(mid) if mid is not None else None,
+                )
+                for r, mid in zip(rows, map(_movie_id, rows))
+            ]
         except Exception as _e:  # noqa: BLE001
             # keep demo resilient: return a single safe item if everything fails
             items.append(Recommendation(title=f"Fallback pick for '{mood}'", source="fallback", score=0.5))
 
-        result: RecommendationList = RecommendationList(items=items)
-        cache[key] = result
-        return result
+        result: RecommendationList = RecommendationList.model_construct(items=items)
+        entry: Tuple[RecommendationList, bytes] = (result, result.model_dump_json().encode())
+        if complete:  # don't pin missing providers for the whole TTL; laggards fill the provider cache meanwhile
+            cache[seed] = entry
+        return entry